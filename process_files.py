@@ -1,6 +1,121 @@
+import collections
 import concurrent.futures
+import itertools
+import os
+from typing import Iterator
 from text_variations import generate_text_variations
 
+# Output is accumulated until at least this many bytes are pending, then written to the file at once.
+_WRITE_CHUNK_SIZE = 1 << 20
+
+# Cache of already expanded lines in each worker process. Only lines with a few variations are cached,
+# so the memory held by a worker stays small however many variations the input lines produce.
+_small_results_cache: dict = {}
+
+def _generate_variations_tuple(text: str) -> tuple:
+    """
+    Generates all variations of a text as a tuple, so they can be sent back from a worker process.
+
+    Parameters:
+    -----------
+    text : str
+        The input text containing bracketed options from which to generate variations.
+
+    Returns:
+    --------
+    tuple
+        A tuple of all text variations generated from the input text.
+
+    Notes:
+    ------
+    - Duplicate lines that reach the same worker are expanded only once, as long as they produce
+      at most 64 variations. Larger results are not cached, since every worker keeps its own cache
+      and each entry would hold the complete output of a line.
+    """
+    variations = _small_results_cache.get(text)
+    if variations is None:
+        variations = tuple(generate_text_variations(text))
+        if len(variations) <= 64 and len(_small_results_cache) < 1024:
+            _small_results_cache[text] = variations
+    return variations
+
+def _generate_variations_chunk(texts: list) -> list:
+    """
+    Generates the variations of each text in a chunk, so a single task covers several texts.
+
+    Parameters:
+    -----------
+    texts : list
+        The input texts containing bracketed options from which to generate variations.
+
+    Returns:
+    --------
+    list
+        A list holding a tuple of all variations for each input text, in the same order.
+    """
+    return [_generate_variations_tuple(text) for text in texts]
+
+def _map_in_order(executor: concurrent.futures.Executor,
+                  texts: Iterator[str],
+                  chunksize: int,
+                  max_workers: int) -> Iterator[tuple]:
+    """
+    Generates the variations of each text in the executor, yielding them in input order.
+
+    Parameters:
+    -----------
+    executor : concurrent.futures.Executor
+        The executor whose workers generate the variations.
+    texts : Iterator[str]
+        The input texts containing bracketed options from which to generate variations.
+    chunksize : int
+        The number of texts handed to a worker in a single task.
+    max_workers : int
+        The number of workers in the executor, which sets how many chunks are in flight at a time.
+
+    Returns:
+    --------
+    Iterator[tuple]
+        An iterator yielding a tuple of all variations for each input text, in input order.
+
+    Notes:
+    ------
+    - Unlike Executor.map, which submits the whole input up front, at most two chunks per worker
+      are in flight at a time: one being processed and one queued behind it. Input is read only
+      that far ahead, but since workers return the complete output of each text, up to
+      2 * max_workers * chunksize fully expanded texts can be held in memory at once.
+    """
+    chunks = iter(lambda: list(itertools.islice(texts, chunksize)), [])
+    window = 2 * max_workers
+    futures = collections.deque(executor.submit(_generate_variations_chunk, chunk)
+                                for chunk in itertools.islice(chunks, window))
+    while futures:
+        chunk_results = futures.popleft().result()
+        # Keep the workers busy by submitting the next chunk before handing out the results.
+        for chunk in itertools.islice(chunks, 1):
+            futures.append(executor.submit(_generate_variations_chunk, chunk))
+        yield from chunk_results
+
+def _write_all(fd: int, data: bytes) -> None:
+    """
+    Writes all of the data to a file descriptor, retrying until partial writes have completed.
+
+    Parameters:
+    -----------
+    fd : int
+        The file descriptor to write to.
+    data : bytes
+        The data to be written.
+
+    Returns:
+    --------
+    None
+    """
+    with memoryview(data) as view:
+        written = 0
+        while written < len(view):
+            written += os.write(fd, view[written:])
+
 def process_text_variations(append: bool = False,
                             separator: str = '',
                             input_filename: str = 'vargen_source_text.txt',
@@ -9,10 +124,10 @@ def process_text_variations(append: bool = False,
     """
     Processes text variations from a given input file and writes the variations to an output file.
     
-    This function reads lines from the input file, generates variations for each line using the
+    This function streams lines from the input file, generates variations for each line using the
     generate_text_variations function, and writes the variations to the output file. Variations are
-    written in batches to reduce the frequency of write operations. A separator can be inserted
-    between each batch of variations if specified.
+    grouped into batches, and a separator can be inserted after each batch if specified. Writes to
+    the output file are grouped separately into chunks of roughly 1 MiB.
     
     Parameters:
     -----------
@@ -33,8 +148,8 @@ def process_text_variations(append: bool = False,
         Default is 'vargen_result_text.txt'.
         
     batch_size : int, optional
-        The number of text variations to accumulate before writing to the output file.
-        Default is 10.
+        The maximum number of text variations in each batch, which decides where the separator
+        is inserted. Default is 10.
     
     Returns:
     --------
@@ -42,9 +157,11 @@ def process_text_variations(append: bool = False,
     
     Overview:
     ---------
-    The function uses a ThreadPoolExecutor for concurrent processing of text variations to improve
-    performance. It leverages the batch_size parameter to control memory usage and the frequency of
-    write operations to the output file.
+    The function uses a ProcessPoolExecutor for parallel processing of text variations to improve
+    performance, falling back to serial processing for small inputs or when only one CPU is
+    available. The batch_size parameter sets where separators go and caps how many variations are
+    held per batch, while encoded output is accumulated and written to the file in chunks of
+    roughly 1 MiB, independent of batch_size.
     
     Examples:
     ---------
@@ -57,51 +174,105 @@ def process_text_variations(append: bool = False,
     
     Notes:
     ------
-    - The function is designed to be efficient with resource usage, using threads for parallel processing
-      and batching write operations to minimize disk I/O.
+    - The function is designed to be efficient with resource usage, using worker processes for parallel
+      processing and batching write operations to minimize disk I/O.
+    - Variations are written in the same order as the input lines they were generated from.
+    - With serial processing, variations are generated lazily, so only about one batch of them is
+      held in memory at a time, however many variations a single line produces. Worker processes
+      instead return the complete output of each line, so with parallel processing memory use grows
+      with the number of variations per line, for every line that is in flight.
     - Ensure the input file exists and is readable, and that the output file is writable.
     """
 
-    # Initialize an empty list to hold the text lines from the input file.
-    texts = []
-    
-    # Open the input file and read all lines into the 'texts' list.
+    # Keep the input file open for the whole run, so lines are read as they are needed instead of all at once.
     with open(input_filename, 'r', encoding='utf-8') as input_file:
-        texts = input_file.read().splitlines()
+        # Stream the text lines from the input file without their line endings.
+        texts = (line.rstrip('\n') for line in input_file)
 
-    # Determine the file mode based on whether the user wants to append to the file.
-    file_mode = 'a' if append else 'w'
-    
-    # Open the output file and set up a ThreadPoolExecutor for concurrent processing.
-    with open(output_filename, file_mode, encoding='utf-8') as output_file, concurrent.futures.ThreadPoolExecutor() as executor:
-        # Submit tasks to the executor for each line of text to generate variations.
-        futures = [executor.submit(generate_text_variations, text) for text in texts]
-        
-        # Initialize an empty list to accumulate results for batch processing.
-        results_batch = []
-        
-        # Wait for futures to complete and process their results.
-        for future in concurrent.futures.as_completed(futures):
-            # Extend the results batch with the generated variations from each future.
-            results_batch.extend(future.result())
-            
-            # Check if the current batch size meets the threshold for writing to the file.
-            if len(results_batch) >= batch_size:
-                # Write each variation in the batch to the output file.
-                for variation in results_batch:
-                    output_file.write(variation + '\n')
-                
-                # Write the separator to the file if specified.
-                if separator:
-                    output_file.write(separator + '\n')
-                
-                # Clear the results batch to start accumulating the next batch.
-                results_batch = []
-
-        # After processing all futures, check for any remaining variations in the batch.
-        for variation in results_batch:
-            output_file.write(variation + '\n')
-
-        # If there are remaining variations and a separator is specified, write it to the file.
-        if separator and results_batch:
-            output_file.write(separator + '\n')
+        # Generating variations is pure-Python CPU work, so real parallelism requires separate processes.
+        # Each worker costs a process start-up and the pickling of every result it sends back, so read
+        # ahead just enough lines to tell whether the input is large enough to pay for that, and only
+        # spawn workers when there is more than one CPU to run them on.
+        cpu_count = os.cpu_count() or 1
+        head = list(itertools.islice(texts, 32))
+        use_workers = cpu_count > 1 and len(head) == 32
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=cpu_count) if use_workers else None
+
+        try:
+            if executor is None:
+                # Consume the variations lazily, so they never have to be held in memory all at once.
+                results = map(generate_text_variations, itertools.chain(head, texts))
+            else:
+                # Hand out texts in chunks to amortize the inter-process communication overhead.
+                # Generators cannot be sent between processes, so workers return complete tuples.
+                results = _map_in_order(executor, itertools.chain(head, texts), chunksize=32,
+                                        max_workers=cpu_count)
+
+            # Open the output file as a raw descriptor and manage the write buffer manually,
+            # bypassing the locking and per-call encoding of a text file object.
+            output_fd = os.open(output_filename, os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC), 0o666)
+            try:
+                # Writes are handed to a background thread, so generating the next output overlaps with
+                # writing the previous one. A single thread keeps the writes in order.
+                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as writer:
+                    # Encoded output waiting to be written to the file, and the write currently in progress.
+                    pending = bytearray()
+                    write_in_progress = None
+
+                    def write_pending() -> None:
+                        """
+                        Submits all pending output to the background writer, once the previous write has completed.
+                        """
+                        nonlocal pending, write_in_progress
+                        # Waiting here bounds memory use and surfaces any error from the previous write.
+                        if write_in_progress is not None:
+                            write_in_progress.result()
+                        write_in_progress = writer.submit(_write_all, output_fd, pending)
+                        pending = bytearray()
+
+                    def write_batch(batch: list) -> None:
+                        """
+                        Adds a batch of variations, followed by the separator if specified, to the pending output.
+                        """
+                        text = '\n'.join(batch) + '\n'
+                        if separator:
+                            text += separator + '\n'
+                        pending.extend(text.encode('utf-8'))
+                        # Write to the file only once enough output has accumulated.
+                        if len(pending) >= _WRITE_CHUNK_SIZE:
+                            write_pending()
+
+                    # Initialize an empty list to accumulate results for batch processing.
+                    results_batch = []
+                    batch_limit = max(1, batch_size)
+
+                    # Process the generated variations of each text in input order.
+                    for variations in results:
+                        variations = iter(variations)
+                        while True:
+                            # Take only as many variations as fit into the current batch. With serial processing
+                            # the variations are generated lazily, so this keeps memory use bounded however many
+                            # variations a single text produces; worker results already hold the whole text's output.
+                            results_batch.extend(itertools.islice(variations, batch_limit - len(results_batch)))
+
+                            # Move on to the next text once this one is exhausted before the batch is full.
+                            if len(results_batch) < batch_limit:
+                                break
+
+                            # Write the whole batch, followed by the separator if specified.
+                            write_batch(results_batch)
+
+                            # Clear the results batch, reusing the list for the next batch.
+                            results_batch.clear()
+
+                    # After processing all texts, write any remaining variations (and the separator).
+                    if results_batch:
+                        write_batch(results_batch)
+                    write_pending()
+                    write_in_progress.result()
+            finally:
+                os.close(output_fd)
+        finally:
+            # Shut down the worker processes, if any were started.
+            if executor is not None:
+                executor.shutdown()
@@ -1,6 +1,22 @@
 import re
+from typing import Iterator
 
-def generate_text_variations(text: str) -> list:
+# Patterns compiled once at import time, since they are applied on every recursive call
+_BRACKETS_RE = re.compile(r'[\[\]]')
+_OPTION_TOKENS_RE = re.compile(r'[\[\]|]')
+
+def _collapse_spaces(text: str) -> str:
+    """
+    Collapses runs of spaces into a single space and removes leading and trailing spaces.
+
+    Splitting on single spaces and joining the non-empty parts does this in C, without the
+    overhead of a regular expression. Other whitespace, such as tabs, is left untouched.
+    ASCII text is already stored one byte per character, so a round trip through bytes would
+    only add the cost of encoding and decoding.
+    """
+    return ' '.join(filter(None, text.split(' ')))
+
+def generate_text_variations(text: str) -> Iterator[str]:
     """
     Generates all possible text variations based on the options provided within brackets.
 
@@ -11,8 +27,8 @@ def generate_text_variations(text: str) -> list:
 
     Returns:
     --------
-    list
-        A list of all possible text variations generated from the input text.
+    Iterator[str]
+        An iterator lazily yielding all possible text variations generated from the input text.
 
     Overview:
     ---------
@@ -23,10 +39,10 @@ def generate_text_variations(text: str) -> list:
 
     Examples:
     ---------
-    >>> generate_text_variations("Hello [World|Universe]!")
+    >>> list(generate_text_variations("Hello [World|Universe]!"))
     ['Hello World!', 'Hello Universe!']
 
-    >>> generate_text_variations("Good [[morning|evening], [John|Jane]| day]!")
+    >>> list(generate_text_variations("Good [[morning|evening], [John|Jane]| day]!"))
     ['Good morning, John!', 'Good morning, Jane!', 'Good evening, John!', 'Good evening, Jane!', 'Good day!']
 
     Notes:
@@ -35,8 +51,17 @@ def generate_text_variations(text: str) -> list:
       of text variations.
     - Options within brackets are separated by '|', and each option can contain further nested
       brackets for additional variations.
+    - Variations are produced lazily, so the full set never has to be held in memory at once.
+      Only the variants of each bracketed section and a bounded list of shared endings are kept,
+      since they are combined with every variant of the other sections.
+    - Deeply nested brackets are expanded recursively, but any number of consecutive bracketed
+      sections is handled without recursion.
     """
 
+    # Text without brackets has exactly one variation, so skip the expansion machinery entirely
+    if '[' not in text:
+        return iter((_collapse_spaces(text).strip(),))
+
     def find_matching_bracket(text: str, start_index: int) -> int:
         """
         Finds the index of the matching closing bracket for an opening bracket in a string.
@@ -66,13 +91,14 @@ def generate_text_variations(text: str) -> list:
         """
         # Initialize depth to account for nested brackets
         depth = 1
-        for i in range(start_index + 1, len(text)):
-            if text[i] == '[':
+        # Visit only the brackets, letting the regex engine skip over plain text
+        for match in _BRACKETS_RE.finditer(text, start_index + 1):
+            if match.group() == '[':
                 depth += 1
-            elif text[i] == ']':
+            else:
                 depth -= 1
                 if depth == 0:
-                    return i  # Matching closing bracket found
+                    return match.start()  # Matching closing bracket found
         return -1  # No matching closing bracket found
 
     def split_options(option_text: str) -> list:
@@ -101,65 +127,190 @@ def generate_text_variations(text: str) -> list:
         >>> split_options("nested [option1|option2]|option3")
         ['nested [option1|option2]', 'option3']
         """
+        # Without nested brackets, every separator splits the options
+        if '[' not in option_text and ']' not in option_text:
+            return option_text.split('|')
+
         options, depth, start = [], 0, 0
-        for i, char in enumerate(option_text):
+        # Visit only the brackets and separators, letting the regex engine skip over plain text
+        for match in _OPTION_TOKENS_RE.finditer(option_text):
+            char = match.group()
             if char == '[': depth += 1
             elif char == ']': depth -= 1
-            elif char == '|' and depth == 0:
+            elif depth == 0:
+                i = match.start()
                 options.append(option_text[start:i])  # End of an option
                 start = i + 1  # Start of the next option
         options.append(option_text[start:])  # Add the last option
         return options
 
-    def generate_variations_recursive(current_text: str) -> list:
+    def join(left: str, right: str) -> str:
         """
-        Recursively generates all possible variations of a text with bracketed options.
+        Joins two pieces of text without creating a run of spaces where they meet.
+
+        Parameters:
+        -----------
+        left : str
+            The leading piece of text.
+        right : str
+            The trailing piece of text.
+
+        Returns:
+        --------
+        str
+            The joined text, with one space dropped if both pieces have a space at the joint.
+
+        Notes:
+        ------
+        - The pieces never contain runs of spaces themselves, since spaces are collapsed in the
+          template up front, so dropping a single space at the joint is enough.
+        """
+        if left.endswith(' ') and right.startswith(' '):
+            return left + right[1:]
+        return left + right
+
+    def trim_leading_space(texts: list) -> list:
+        """
+        Removes a single leading space from each text that starts with one.
+
+        Parameters:
+        -----------
+        texts : list
+            The texts to be trimmed.
+
+        Returns:
+        --------
+        list
+            A new list of the trimmed texts, in the same order.
+        """
+        return [text[1:] if text.startswith(' ') else text for text in texts]
+
+    # Cache of already expanded options; the same options can recur across bracketed sections
+    cache: dict = {}
+
+    def expand(current_text: str) -> list:
+        """
+        Returns all variations of a text as a list, reusing previously expanded texts.
 
         Parameters:
         -----------
         current_text : str
-            The input text containing bracketed options to be expanded.
+            The text containing bracketed options to be expanded.
 
         Returns:
         --------
         list
             A list of all generated text variations.
 
+        Notes:
+        ------
+        - The cache is bounded to 100,000 entries so pathological inputs cannot exhaust memory;
+          once full, new results are simply not cached.
+        - Cached lists are shared between callers, so they must only be read, never modified.
+        """
+        # Text without brackets has exactly one variation, so there is nothing worth caching
+        if '[' not in current_text:
+            return [current_text]
+
+        variations = cache.get(current_text)
+        if variations is None:
+            variations = list(generate_variations_iterative(current_text))
+            if len(cache) < 100_000:
+                cache[current_text] = variations
+        return variations
+
+    def generate_variations_iterative(current_text: str) -> Iterator[str]:
+        """
+        Generates all possible variations of a text with bracketed options.
+
+        Parameters:
+        -----------
+        current_text : str
+            The input text containing bracketed options to be expanded.
+
+        Returns:
+        --------
+        Iterator[str]
+            An iterator yielding all generated text variations.
+
         Overview:
         ---------
-        This function identifies the first set of bracketed options in the input text,
-        generates variations for it, and recursively applies itself to the rest of the text,
-        combining generated variations to produce all possible outcomes.
+        This function splits the text into plain segments and the bracketed sections between
+        them, expanding the options of each section once. The trailing sections are combined into
+        a bounded list of shared tails, and every combination of the leading sections is walked
+        using an explicit stack of partially built variations, so each partial variation is built
+        once and shared by all variations that start with it. Only options containing nested
+        brackets are expanded recursively, which bounds the recursion depth by the nesting depth
+        rather than by the number of bracketed sections in the text.
 
         Examples:
         ---------
-        >>> generate_variations_recursive("Hello [World|Universe]")
+        >>> list(generate_variations_iterative("Hello [World|Universe]"))
         ['Hello World', 'Hello Universe']
-        >>> generate_variations_recursive("Nested [example [one|two]|case]")
+        >>> list(generate_variations_iterative("Nested [example [one|two]|case]"))
         ['Nested example one', 'Nested example two', 'Nested case']
         """
-        # Search for the first opening bracket
-        match = re.search(r'\[', current_text)
-        if not match:
-            return [current_text]  # No more variations to generate
-
-        start_index = match.start()
-        end_index = find_matching_bracket(current_text, start_index)
-        if end_index == -1:
-            return [current_text]  # No matching closing bracket found
-
-        # Split the text into prefix, options, and suffix
-        prefix = current_text[:start_index]
-        suffix = current_text[end_index+1:]
-        options = split_options(current_text[start_index+1:end_index])
-
-        # Recursively generate variations for each option
-        variations = []
-        for option in options:
-            for variant in generate_variations_recursive(option):
-                for suffix_variant in generate_variations_recursive(suffix):
-                    variations.append(f"{prefix}{variant}{suffix_variant}")
-        return variations
+        # Split the text into plain segments and the variants of the bracketed sections between them
+        segments, sections, position = [], [], 0
+        while True:
+            # Search for the next opening bracket
+            start_index = current_text.find('[', position)
+            if start_index == -1:
+                break  # No more bracketed sections
+
+            end_index = find_matching_bracket(current_text, start_index)
+            if end_index == -1:
+                break  # No matching closing bracket found, so the rest is plain text
+
+            segments.append(current_text[position:start_index])
+            sections.append([variant for option in split_options(current_text[start_index+1:end_index])
+                             for variant in expand(option)])
+            position = end_index + 1
+        segments.append(current_text[position:])
+
+        if not sections:
+            yield current_text
+            return
+
+        # The trailing sections and segments end every variation, so combine them into shared tails
+        # once, for as many sections as keep the list of tails reasonably small
+        tail_level = len(sections) - 1
+        tails = [join(variant, segments[-1]) for variant in sections[tail_level]]
+        # The same tails without a leading space, computed only if a partial variation ends with a space
+        trimmed_tails = None
+        while tail_level > 0 and len(tails) * len(sections[tail_level - 1]) <= 4096:
+            segment = segments[tail_level]
+            tail_level -= 1
+            combined_tails = []
+            for variant in sections[tail_level]:
+                head = join(variant, segment)
+                if head.endswith(' '):
+                    if trimmed_tails is None:
+                        trimmed_tails = trim_leading_space(tails)
+                    combined_tails.extend([head + tail for tail in trimmed_tails])
+                else:
+                    combined_tails.extend([head + tail for tail in tails])
+            tails, trimmed_tails = combined_tails, None
+
+        # Each stack entry is a partial variation covering the sections before the given level
+        stack = [(0, segments[0])]
+        while stack:
+            level, head = stack.pop()
+            if level == tail_level:
+                if head.endswith(' '):
+                    if trimmed_tails is None:
+                        trimmed_tails = trim_leading_space(tails)
+                    for tail in trimmed_tails:
+                        yield head + tail
+                else:
+                    for tail in tails:
+                        yield head + tail
+            else:
+                # Push in reverse, so the variants are popped and generated in their original order
+                segment = segments[level + 1]
+                for variant in reversed(sections[level]):
+                    stack.append((level + 1, join(join(head, variant), segment)))
 
-    # Generate and return variations with extra spaces removed
-    return [re.sub(' +', ' ', variation).strip() for variation in generate_variations_recursive(text)]
+    # Collapse runs of spaces once in the template rather than in every generated variation,
+    # then return the variations with leading and trailing whitespace removed
+    return (variation.strip() for variation in generate_variations_iterative(_collapse_spaces(text)))